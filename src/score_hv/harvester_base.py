@@ -6,11 +6,14 @@ Collection of methods to facilitate file/object retrieval
 
 """
 import argparse
+import logging
 
 from score_hv.yaml_utils import YamlLoader
 from score_hv import hv_registry as hvr
 from score_hv import file_utils
 
+logger = logging.getLogger(__name__)
+
 def harvest(harvest_config):
     """
     Gets harvester config as either a yaml file or dict and returns
@@ -42,17 +45,13 @@ def harvest(harvest_config):
     # harvesters).
     try:
         harvester_name = harvest_dict.get('harvester_name')
-        print(f'harvester_name: {harvester_name}')
-        print(f'harvester_registry: {hvr.harvester_registry}, ' \
-                f'type(harvester_registry): {type(hvr.harvester_registry)}')
         harvester = hvr.harvester_registry.get(harvester_name)
     except Exception as err:
         msg = f'could not find harvester from config: {harvest_dict}'
         raise KeyError(msg) from err
 
-    print(f'harvester_name: {harvester_name}')
+    logger.debug('harvester_name: %s', harvester_name)
     config = harvester.config_handler(harvest_dict)
-    print(f'type(config): {type(config)}')
     return harvester.data_parser(config).get_data()
 
 
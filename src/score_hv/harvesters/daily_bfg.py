@@ -1,23 +1,25 @@
 #!/usr/bin/env python
 
 import os
-import sys
+import functools
 from pathlib import Path
 from collections import namedtuple
 from dataclasses import dataclass
 from dataclasses import field
 from datetime import datetime as dt
 
+import dask
 import xarray as xr
 import numpy as np
 import cftime
-from netCDF4 import MFDataset
+from netCDF4 import Dataset
 
 from score_hv.config_base import ConfigInterface
 from score_hv import stats_utils
 
 HARVESTER_NAME = 'daily_bfg'
 VALID_STATISTICS = ('mean', 'variance', 'minimum', 'maximum')
+MEDIAN_TIME_UNITS = 'hours since 1951-01-01 00:00:00'
 
 """Variables of interest that come from the background forecast data.
 Commented out variables can be uncommented to generate gridcell weighted
@@ -40,6 +42,19 @@ VALID_VARIABLES  = (#'icetk', # sea ice thickness (m)
                     #'weasd', # surface snow water equivalent (mm weq.)
                     )
 
+"""Sets of the valid variables and statistics for the membership checks in
+DailyBFGConfig; the tuples above keep their order for the error messages.
+"""
+_VALID_VARIABLES_SET = frozenset(VALID_VARIABLES)
+_VALID_STATISTICS_SET = frozenset(VALID_STATISTICS)
+
+"""Variables that are derived from other variables on the background forecast
+files, mapped to the component variables that are read to calculate them.
+"""
+DERIVED_VARIABLES = {'netrf_avetoa': ('dswrf_avetoa',
+                                      'uswrf_avetoa',
+                                      'ulwrf_avetoa')}
+
 HarvestedData = namedtuple('HarvestedData', ['filenames',
                                              'statistic',
                                              'variable',
@@ -53,6 +68,61 @@ def get_gridcell_area_data_path():
                         'data', 'gridcell-area' + 
                         '_noaa-ufs-gefsv13replay-pds' + 
                         '_bfg_control_1536x768_20231116.nc')
+
+def _toa_net_radiative_flux(dswrf, uswrf, ulwrf):
+    """ returns dswrf - uswrf - ulwrf, writing the second difference into
+        the output of the first so only one output array is allocated
+    """
+    netrf = np.subtract(dswrf, uswrf)
+    return np.subtract(netrf, ulwrf, out=netrf)
+
+def get_median_cftime(xr_dataset):
+    """ returns the median temporal midpoint (a cftime object) of the 
+        timestamps in xr_dataset. The timestamps are converted to numbers
+        with a single (vectorized) cftime.date2num call on the time array
+    """
+    temporal_endpoints = cftime.date2num(xr_dataset['time'].values,
+                                         MEDIAN_TIME_UNITS)
+    
+    if temporal_endpoints.size > 1:
+        """ can estimate the time step only if there're more than 1 
+            timestamps. For evenly spaced timestamps the shift from endpoints
+            to midpoints is half of the (scalar) time step; otherwise it is
+            estimated with a finite difference at each timestamp
+        """
+        time_steps = np.diff(temporal_endpoints)
+        if np.allclose(time_steps, time_steps[0]):
+            median_midpoint = np.median(temporal_endpoints) - time_steps[0]/2.
+        else:
+            median_midpoint = np.median(temporal_endpoints - 
+                                        np.gradient(temporal_endpoints)/2.)
+        
+        median_cftime = cftime.num2date(float(median_midpoint),
+                                        MEDIAN_TIME_UNITS)
+    else:
+        median_cftime = cftime.num2date(float(temporal_endpoints[0]),
+                                        MEDIAN_TIME_UNITS)
+    return median_cftime
+
+@functools.lru_cache(maxsize=1)
+def _load_gridcell_area():
+    """ returns the gridcell area weights and their sum. The gridcell area
+        file never changes within a process, so it is read once and the
+        result is reused by every subsequent harvest. The weights are kept in
+        double precision so that the weighted sums accumulate in float64; the
+        returned array is a contiguous, read-only buffer since it is shared by
+        all harvests. Only the area variable is needed, so it is read directly
+        with netCDF4 rather than decoding the whole file with xarray
+    """
+    with Dataset(get_gridcell_area_data_path()) as gridcell_area_data:
+        gridcell_area_data.set_auto_mask(False)
+        gridcell_area_weights = np.ascontiguousarray(
+                                    gridcell_area_data.variables['area'][:],
+                                    dtype=np.float64)
+    
+    gridcell_area_weights.flags.writeable = False
+    return gridcell_area_weights, float(gridcell_area_weights.sum())
+
 @dataclass
 class DailyBFGConfig(ConfigInterface):
 
@@ -75,7 +145,7 @@ class DailyBFGConfig(ConfigInterface):
         
         self.variables = self.config_data.get('variable')
         for var in self.variables:
-            if var not in VALID_VARIABLES:
+            if var not in _VALID_VARIABLES_SET:
                 msg = ("'%s' is not a supported "
                        "variable to harvest from the background forecast data. "
                        "Please reconfigure the input dictionary using only the "
@@ -92,7 +162,7 @@ class DailyBFGConfig(ConfigInterface):
         """
         self.stats = self.config_data.get('statistic')
         for stat in self.stats:
-            if stat not in VALID_STATISTICS:
+            if stat not in _VALID_STATISTICS_SET:
                 msg = ("'%s' is not a supported statistic to harvest from "
                        "daily mean background forecast data. "
                        "Please reconfigure the input dictionary using only the "
@@ -120,6 +190,24 @@ class DailyBFGHv(object):
                   returns a list of tuples containing specific data
     """
     config: DailyBFGConfig = field(default_factory=DailyBFGConfig)
+    
+    def get_drop_variables(self):
+        """ returns a list of the variables on the input files that are not
+            needed to harvest the requested variables. Only the first file is
+            probed; the background forecast files of a harvest are expected
+            to share the same variables. Dropping the unused variables at
+            open time skips decoding and concatenating them for every file.
+        """
+        needed_variables = set()
+        for variable in self.config.get_variables():
+            needed_variables.update(DERIVED_VARIABLES.get(variable,
+                                                          (variable,)))
+        
+        with Dataset(self.config.harvest_filenames[0]) as rootgrp:
+            drop_variables = [var for var in rootgrp.variables.keys() if 
+                              var not in needed_variables and 
+                              var not in rootgrp.dimensions]
+        return drop_variables
      
     def get_data(self):
         """ Harvests requested statistics and variables from background 
@@ -137,30 +225,53 @@ class DailyBFGHv(object):
         """
         harvested_data = list()
         
-        xr_dataset = xr.open_mfdataset(self.config.harvest_filenames, 
-                                       combine='nested', 
-                                       concat_dim='time',
-                                       decode_times=True)
-        gridcell_area_data = xr.open_dataset(get_gridcell_area_data_path())
-        gridcell_area_weights = gridcell_area_data.variables['area']
-
-        temporal_endpoints = np.array([cftime.date2num(time,
-            'hours since 1951-01-01 00:00:00') for time in xr_dataset['time']])
-        
-        if len(self.config.harvest_filenames) > 1:
-            """ can estimate the time step only if there're more than 1 
-                timestamps
+        drop_variables = self.get_drop_variables()
+        if len(self.config.harvest_filenames) == 1:
+            """ A single forecast file does not need to be combined with
+                anything, so it is opened directly rather than through
+                open_mfdataset's combine logic. It is still chunked by time
+                so that the rest of the harvest stays lazy, as for many files
             """
-            temporal_midpoints = temporal_endpoints - np.gradient(temporal_endpoints)/2.
-        
-            median_cftime = cftime.num2date(np.median(temporal_midpoints),
-                                            'hours since 1951-01-01 00:00:00')
+            xr_dataset = xr.open_dataset(self.config.harvest_filenames[0],
+                                         engine='netcdf4',
+                                         decode_times=True,
+                                         drop_variables=drop_variables,
+                                         chunks={'time': 1})
         else:
-            median_cftime = cftime.num2date(np.median(temporal_endpoints),
-                                            'hours since 1951-01-01 00:00:00')
+            """ Each forecast file holds one time step, so chunking by time
+                gives one dask chunk per file. Only variables with a time
+                dimension are concatenated; the grid coordinates are taken
+                from the first file instead of being compared across every
+                file.
+            """
+            xr_dataset = xr.open_mfdataset(self.config.harvest_filenames, 
+                                           engine='netcdf4',
+                                           combine='nested', 
+                                           concat_dim='time',
+                                           decode_times=True,
+                                           drop_variables=drop_variables,
+                                           chunks={'time': 1},
+                                           parallel=True,
+                                           data_vars='minimal',
+                                           coords='minimal',
+                                           compat='override')
+        gridcell_area_weights, sum_global_weights = _load_gridcell_area()
+
+        median_cftime = get_median_cftime(xr_dataset)
+        mediantime = dt(median_cftime.year, median_cftime.month,
+                        median_cftime.day, median_cftime.hour,
+                        median_cftime.minute, median_cftime.second,
+                        median_cftime.microsecond)
 
-        for i, variable in enumerate(self.config.get_variables()):
-            """ The first nested loop iterates through each requested variable.
+        filenames = self.config.harvest_filenames
+        variables = self.config.get_variables()
+        stats_list = self.config.get_stats()
+        
+        variable_info = list()
+        lazy_temporal_means = list()
+        for variable in variables:
+            """ The first loop iterates through each requested variable and
+                builds its (lazy) temporal mean.
             """
             if variable == 'netrf_avetoa': 
                 """The variable name netrf_avetoa referes to the top of the 
@@ -179,16 +290,10 @@ class DailyBFGHv(object):
                 units = "W/m**2"
                 
                 try:
-                    temporal_means = (
-                        np.ma.masked_invalid(xr_dataset['dswrf_avetoa'].mean(
-                                                                dim='time',
-                                                                skipna=True)) - 
-                        np.ma.masked_invalid(xr_dataset['uswrf_avetoa'].mean(
-                                                                dim='time',
-                                                                skipna=True)) - 
-                        np.ma.masked_invalid(xr_dataset['ulwrf_avetoa'].mean(
-                                                                dim='time',
-                                                                skipna=True)))
+                    dswrf, uswrf, ulwrf = xr.align(
+                        *[xr_dataset[component].astype(np.float32, copy=False)
+                          for component in DERIVED_VARIABLES[variable]],
+                        join='exact')
                 except KeyError as err:
                     msg = (f'{xr_dataset.data_vars} '
                            'do not include all '
@@ -197,51 +302,54 @@ class DailyBFGHv(object):
                            '("dswrf_avetoa," "uswrf_avetoa" and '
                            '"ulwrf_avetoa")')
                     raise KeyError(msg) from err
+                
+                """The net flux is built on the (lazy) dask arrays of the
+                components, so the difference and the temporal mean below
+                are evaluated together, chunk by chunk
+                """
+                variable_data = xr.apply_ufunc(_toa_net_radiative_flux,
+                                               dswrf, uswrf, ulwrf,
+                                               dask='parallelized',
+                                               output_dtypes=[np.float32])
                                                                 
             else:
-                variable_data = xr_dataset[variable]
-                if 'long_name' in variable_data.attrs:
-                    longname = variable_data.attrs['long_name']
-                else:
-                    longname = "None"
-                if 'units' in variable_data.attrs:
-                    units = variable_data.attrs['units']
-                else:
-                    units = "None"
-                
-                temporal_means = np.ma.masked_invalid(
-                    variable_data.mean(dim='time',skipna=True))
+                variable_data = xr_dataset[variable].astype(np.float32,
+                                                            copy=False)
+                longname = variable_data.attrs.get('long_name', "None")
+                units = variable_data.attrs.get('units', "None")
             
-            expected_value = stats_utils.area_weighted_mean(
-                                               temporal_means,
-                                               gridcell_area_weights)
+            variable_info.append((variable, longname, units))
+            lazy_temporal_means.append(variable_data.mean(dim='time',
+                                                          skipna=True))
+        
+        """ The temporal means of all requested variables are evaluated in a
+            single dask computation, so reads of the same chunks (e.g., a
+            variable that is also a netrf_avetoa component) are shared and
+            the variables are reduced concurrently
+        """
+        temporal_means_list = dask.compute(*lazy_temporal_means)
+        
+        for (variable, longname, units), temporal_means in zip(
+                                                variable_info,
+                                                temporal_means_list):
+            """ The statistics are calculated for each requested variable
+            """
+            statistics = stats_utils.area_weighted_statistics(
+                                        temporal_means.values,
+                                        gridcell_area_weights,
+                                        sum_weights=sum_global_weights,
+                                        statistics=stats_list)
             
-            for j, statistic in enumerate(self.config.get_stats()):
-                """ The second nested loop iterates through each requested 
-                    statistic
-                """
-                if statistic == 'mean':
-                    value = expected_value
-                elif statistic == 'variance':
-                    value = stats_utils.area_weighted_variance(
-                                                temporal_means,
-                                                gridcell_area_weights,        
-                                                expected_value=expected_value)
-                elif statistic == 'maximum':
-                    value = np.ma.max(temporal_means)
-                
-                elif statistic == 'minimum':
-                    value = np.ma.min(temporal_means)
-                
-                harvested_data.append(HarvestedData(
-                                    self.config.harvest_filenames,
-                                    statistic, 
-                                    variable,
-                                    np.float32(value),
-                                    units,
-                                    dt.fromisoformat(median_cftime.isoformat()),
-                                    longname))
+            """ One harvested data tuple is built for each requested statistic
+            """
+            harvested_data.extend(
+                HarvestedData(filenames,
+                              statistic,
+                              variable,
+                              np.float32(statistics[statistic]),
+                              units,
+                              mediantime,
+                              longname) for statistic in stats_list)
         
-        gridcell_area_data.close()
         xr_dataset.close()
         return harvested_data
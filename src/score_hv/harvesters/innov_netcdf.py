@@ -8,12 +8,16 @@ Collection of methods to facilitate file/object retrieval
 from collections import namedtuple
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+import logging
 import netCDF4
 import pandas as pd
 
 from score_hv.config_base import ConfigInterface
 from score_hv import file_utils
 from score_hv import hv_registry as hvr
+
+logger = logging.getLogger(__name__)
+
 valid_metrics = [
     'temperature',
     'spechumid',
@@ -125,7 +129,7 @@ class MetricMeta:
                     f'{MIN_CYCLE_DATETIME}.'
                 raise ValueError(msg) from err
 
-            print(f'self.cycletime: {self.cycletime}')
+            logger.debug('self.cycletime: %s', self.cycletime)
             filename_cycle_time = self.cycletime + timedelta(hours=6)
             self.filepath = datetime.strftime(self.cycletime, filepath_format_str)
             self.filename = self.filepath
@@ -177,9 +181,9 @@ class HarvestConfig:
                 f'({valid_metrics}) - err: {err}'
             raise KeyError(msg) from err
 
-        print(f'config_data: {self.config_data}')
+        logger.debug('config_data: %s', self.config_data)
         file_meta = self.config_data.get('file_meta')
-        print(f'file_meta: {file_meta}')
+        logger.debug('file_meta: %s', file_meta)
         for metric in self.metrics:
             try:
 
@@ -361,7 +365,7 @@ class InnovStatsHv:
             ev_unit = self.config.get_elevation_unit()
 
             elevations = ncfile.variables[ev_unit][...]
-            print(f'\'{ev_unit}\': {elevations}')
+            logger.debug('\'%s\': %s', ev_unit, elevations)
             regions = self.config.get_regions()
             stats = self.config.get_stats()
 
@@ -10,14 +10,19 @@ The functions generally take the following two input variables:
 
 import numpy as np
 
+STATISTICS = ('mean', 'variance', 'minimum', 'maximum')
+
 def area_weighted_mean(xarray_variable, gridcell_area_weights):  
     """returns the gridcell area weighted mean of xarray_variable and checks
     that gridcell_area_weights are valid
     """
-    weighted_mean, sumweights = np.ma.average(xarray_variable,
-                                              weights=gridcell_area_weights,
-                                              returned=True)
+    return area_weighted_statistics(xarray_variable, gridcell_area_weights,
+                                    statistics=('mean',))['mean']
 
+def check_gridcell_area_weights(gridcell_area_weights, sumweights):
+    """checks that gridcell_area_weights sum to 4pi steradians (the area of
+    the unit sphere)
+    """
     try:
         assert sumweights >= 0.999 * 4. * np.pi
         assert sumweights <= 1.001 * 4. * np.pi
@@ -26,24 +31,109 @@ def area_weighted_mean(xarray_variable, gridcell_area_weights):
                '(gridcell area weights) sum does not equal 4pi steradians; ' 
                'cannot calculate accurate global/regional weighted statistics')
         raise AssertionError(msg) from err
-    return(weighted_mean)
+
+def _valid_values_and_weights(xarray_variable, gridcell_area_weights,
+                              sum_weights=None):
+    """returns flat float64 arrays of the valid (not masked, not NaN) values
+    of xarray_variable, their gridcell area weights and the sum of those
+    weights. Invalid values are found with one boolean mask rather than
+    through numpy.ma, so the reductions on the returned arrays run on plain
+    ndarrays. Both arrays are double precision so that the weighted sums over
+    the whole grid accumulate in float64, even for float32 input data.
+    sum_weights is only used if all values are valid. A ValueError is raised
+    if xarray_variable and gridcell_area_weights are not on the same grid.
+    """
+    if np.shape(xarray_variable) != np.shape(gridcell_area_weights):
+        msg = (f'variable shape {np.shape(xarray_variable)} does not match '
+               f'gridcell area weights shape {np.shape(gridcell_area_weights)}')
+        raise ValueError(msg)
+    
+    if np.ma.isMaskedArray(xarray_variable):
+        values = xarray_variable.filled(np.nan).ravel()
+    else:
+        values = np.asarray(xarray_variable).ravel()
+    values = values.astype(np.float64, copy=False)
+    weights = np.asarray(gridcell_area_weights, dtype=np.float64).ravel()
+    
+    valid = np.isfinite(values)
+    if valid.all():
+        if sum_weights is None:
+            sum_weights = weights.sum()
+    else:
+        values = values[valid]
+        weights = weights[valid]
+        sum_weights = weights.sum()
+    return values, weights, sum_weights
+
+def _weighted_variance(values, weights, sum_weights, expected_value):
+    """returns sum_R{ w_i * (x_i - expected_value)^2 } / sum_R{ w_i } for the
+    flat arrays returned by _valid_values_and_weights. The anomalies are
+    formed first to avoid the cancellation error of
+    sum_R{ w_i * x_i^2 } - expected_value^2.
+    """
+    anomalies = values - expected_value
+    return np.dot(weights * anomalies, anomalies) / sum_weights
+
+def area_weighted_statistics(xarray_variable, gridcell_area_weights,
+                             sum_weights=None, statistics=STATISTICS):
+    """returns a dictionary with the requested statistics of xarray_variable,
+    any of the gridcell area weighted mean and variance and the minimum and
+    maximum (see STATISTICS). Invalid (masked or NaN)
+    values are excluded. The statistics are calculated together from flat
+    views of the data, so each requested statistic does not make its own
+    pass over the grid:
+    
+        mean = sum_R{ w_i * x_i } / sum_R{ w_i },
+        variance = sum_R{ w_i * (x_i - mean)^2 } / sum_R{ w_i },
+    
+    where the sums are accumulated in float64 and the variance is accumulated
+    from the anomalies to avoid the cancellation error of
+    sum_R{ w_i * x_i^2 } - mean^2.
+    The sum of the gridcell area weights can be passed as sum_weights when it
+    is already known; it is only used if all values are valid. Reductions
+    that are not needed for the requested statistics are skipped.
+    """
+    values, weights, sum_weights = _valid_values_and_weights(
+                                                        xarray_variable,
+                                                        gridcell_area_weights,
+                                                        sum_weights)
+    
+    check_gridcell_area_weights(gridcell_area_weights, sum_weights)
+    
+    results = dict()
+    if 'mean' in statistics or 'variance' in statistics:
+        weighted_mean = np.dot(weights, values) / sum_weights
+        if 'mean' in statistics:
+            results['mean'] = weighted_mean
+        if 'variance' in statistics:
+            results['variance'] = _weighted_variance(values, weights,
+                                                     sum_weights,
+                                                     weighted_mean)
+    if 'minimum' in statistics:
+        results['minimum'] = values.min()
+    if 'maximum' in statistics:
+        results['maximum'] = values.max()
+    return results
 
 def area_weighted_variance(xarray_variable, gridcell_area_weights,
-                           expected_value=None):
+                           expected_value=None, sum_weights=None):
     """returns the gridcell weighted variance of the requested variables using
     the following formula:
                         
         variance = sum_R{ w_i * (x_i - xbar)^2 },
     
     where sum_R represents the summation for each value x_i over the region of 
-    interest R with normalized gridcell area weights w_i and weighted mean xbar
+    interest R with normalized gridcell area weights w_i and weighted mean xbar.
+    xbar is calculated unless it is passed as expected_value. The sum of the
+    gridcell area weights can be passed as sum_weights when it is already
+    known. Invalid (masked or NaN) values are excluded.
     """
-    if expected_value == None:
-        expected_value = calculate_weighted_means(xarray_variable,
-                                                  gridcell_area_weights)
-    
-    weighted_variance = -expected_value**2 + np.ma.sum(
-                                               xarray_variable**2 * 
-                                               (gridcell_area_weights / 
-                                                gridcell_area_weights.sum()))
-    return(weighted_variance)
\ No newline at end of file
+    values, weights, sum_weights = _valid_values_and_weights(
+                                                        xarray_variable,
+                                                        gridcell_area_weights,
+                                                        sum_weights)
+    check_gridcell_area_weights(gridcell_area_weights, sum_weights)
+    
+    if expected_value is None:
+        expected_value = np.dot(weights, values) / sum_weights
+    return _weighted_variance(values, weights, sum_weights, expected_value)
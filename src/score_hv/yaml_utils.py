@@ -6,9 +6,12 @@ Collection of methods to facilitate file/object retrieval
 
 """
 from dataclasses import dataclass, field
+import logging
 import pathlib
 import yaml
 
+logger = logging.getLogger(__name__)
+
 
 def validate_yaml(value):
     ''' ensure yaml file exists and has the correct extension '''
@@ -46,9 +49,9 @@ class YamlLoader:
 
     def load(self):
         ''' load yaml data '''
-        print(f'multiple_docs: {self.multiple_docs}')
+        logger.debug('multiple_docs: %s', self.multiple_docs)
         try:
-            print(f'loading yaml file: {self.yaml_file}')
+            logger.debug('loading yaml file: %s', self.yaml_file)
             with open(self.yaml_file, 'r', encoding="utf-8") as yaml_stream:
                 documents = list(
                     yaml.load_all(yaml_stream, Loader=yaml.SafeLoader)
@@ -78,7 +81,7 @@ class YamlLoader:
 
         found_keys = list(self._get_nested_key(key, document))
 
-        print(f'values found: {found_keys}')
+        logger.debug('values found: %s', found_keys)
 
         if len(found_keys) > 1:
             msg = f'Key "{key}" found multiple times. Result ambiguous.'
@@ -109,6 +109,31 @@ def test_global_mean_values_netCDF4(tolerance=0.001):
             
     gridcell_area_data.close()
                 
+def test_global_mean_float64_reference(tolerance=1e-6):
+    """The harvested mean must match a float64 np.average of the temporal
+    mean to float32 precision, i.e. the weighted sum over the grid must not
+    be accumulated in single precision
+    """
+    data1 = harvest(VALID_CONFIG_DICT)
+    
+    with Dataset(GRIDCELL_AREA_DATA_PATH) as gridcell_area_data:
+        gridcell_area = np.asarray(gridcell_area_data.variables['area'][:],
+                                   dtype=np.float64)
+    
+    summation = np.zeros(gridcell_area.shape, dtype=np.float64)
+    for data_file in BFG_PATH:
+        with Dataset(data_file) as test_rootgrp:
+            summation += test_rootgrp.variables[
+                            VALID_CONFIG_DICT['variable'][0]][0].astype(
+                                                                np.float64)
+    temporal_mean = summation / len(BFG_PATH)
+    global_mean = np.average(temporal_mean, weights=gridcell_area)
+    
+    for harvested_tuple in data1:
+        if harvested_tuple.statistic == 'mean':
+            assert abs(harvested_tuple.value - global_mean) <= (
+                                                tolerance * abs(global_mean))
+
 def test_gridcell_variance(tolerance=0.001):
     """Opens each background Netcdf file using the
     netCDF4 library function Dataset and computes the variance
@@ -218,6 +243,7 @@ def main():
     test_units()
     test_global_mean_values_offline()
     test_global_mean_values_netCDF4()
+    test_global_mean_float64_reference()
     test_gridcell_variance()
     test_gridcell_min_max()
     test_cycletime() 
@@ -5,6 +5,8 @@ import sys
 from pathlib import Path 
 
 import numpy as np
+import xarray as xr
+import cftime
 from datetime import datetime
 import pytest
 import yaml
@@ -13,6 +15,8 @@ from score_hv import hv_registry
 from score_hv.harvester_base import harvest
 from score_hv.yaml_utils import YamlLoader
 from score_hv.harvesters.innov_netcdf import Region, InnovStatsCfg
+from score_hv.harvesters.daily_bfg import (DailyBFGConfig, DailyBFGHv,
+                                           get_median_cftime)
 
 TEST_DATA_FILE_NAMES = ['bfg_1994010100_fhr09_toa_radiative_flux_control.nc',
                         'bfg_1994010106_fhr06_toa_radiative_flux_control.nc',
@@ -79,6 +83,64 @@ def test_harvester_get_files():
     assert len(data1) > 0
     assert data1[0].filenames==BFG_PATH
 
+def test_drop_variables():
+    """The component variables of netrf_avetoa and the coordinates must be
+    kept when opening the forecast files
+    """
+    harvester = DailyBFGHv(DailyBFGConfig(VALID_CONFIG_DICT))
+    drop_variables = harvester.get_drop_variables()
+    for var in required_vars + ['time', 'grid_xt', 'grid_yt']:
+        assert var not in drop_variables
+    
+    """Only ulwrf_avetoa is needed when it is harvested on its own, so the
+    other two flux variables on the forecast files must be dropped
+    """
+    ulwrf_config_dict = dict(VALID_CONFIG_DICT)
+    ulwrf_config_dict['variable'] = ['ulwrf_avetoa']
+    harvester = DailyBFGHv(DailyBFGConfig(ulwrf_config_dict))
+    drop_variables = harvester.get_drop_variables()
+    assert sorted(drop_variables) == ['dswrf_avetoa', 'uswrf_avetoa']
+
+def test_multiple_variables():
+    """Harvesting netrf_avetoa together with one of its components must give
+    the same values as harvesting each variable on its own
+    """
+    multi_config_dict = dict(VALID_CONFIG_DICT)
+    multi_config_dict['variable'] = ['netrf_avetoa', 'ulwrf_avetoa']
+    data_multi = harvest(multi_config_dict)
+    
+    ulwrf_config_dict = dict(VALID_CONFIG_DICT)
+    ulwrf_config_dict['variable'] = ['ulwrf_avetoa']
+    data_single = harvest(VALID_CONFIG_DICT) + harvest(ulwrf_config_dict)
+    
+    assert len(data_multi) == len(data_single)
+    for multi_tuple, single_tuple in zip(data_multi, data_single):
+        assert multi_tuple.variable == single_tuple.variable
+        assert multi_tuple.statistic == single_tuple.statistic
+        assert multi_tuple.value == single_tuple.value
+
+def test_single_file():
+    """A single forecast file is opened without open_mfdataset. The harvested
+    global mean must match the area weighted mean of the net flux computed
+    directly from that file
+    """
+    single_config_dict = dict(VALID_CONFIG_DICT)
+    single_config_dict['filenames'] = BFG_PATH[:1]
+    single_config_dict['statistic'] = ['mean']
+    data1 = harvest(single_config_dict)
+    
+    with Dataset(BFG_PATH[0]) as rootgrp:
+        netrf = (rootgrp.variables['dswrf_avetoa'][0] - 
+                 rootgrp.variables['uswrf_avetoa'][0] - 
+                 rootgrp.variables['ulwrf_avetoa'][0])
+    with Dataset(GRIDCELL_AREA_DATA_PATH) as rootgrp:
+        gridcell_area = rootgrp.variables['area'][:]
+    expected_mean = np.ma.average(netrf, weights=gridcell_area)
+    
+    assert len(data1) == 1
+    assert data1[0].filenames == BFG_PATH[:1]
+    assert abs(data1[0].value - expected_mean) <= 0.001 * abs(expected_mean)
+
 def test_variable_names():
     data1 = harvest(VALID_CONFIG_DICT)
     assert data1[0].variable == 'netrf_avetoa'
@@ -99,6 +161,18 @@ def test_cycletime():
                                           "%Y-%m-%d %H:%M:%S")
     assert data1[0].mediantime == expected_datetime
 
+def test_irregular_cycletime():
+    """ For unevenly spaced timestamps the temporal midpoints are estimated
+        with a finite difference at each timestamp. The midpoints of 
+        0, 3, 6 and 12 hours are -1.5, 1.5, 3.75 and 9 hours, so the median
+        midpoint is 2.625 hours (02:37:30)
+    """
+    timestamps = [cftime.DatetimeJulian(1994, 1, 1, hour) 
+                  for hour in (0, 3, 6, 12)]
+    xr_dataset = xr.Dataset(coords={'time': timestamps})
+    median_cftime = get_median_cftime(xr_dataset)
+    assert median_cftime.isoformat() == '1994-01-01T02:37:30'
+
 def test_longname():
     data1 = harvest(VALID_CONFIG_DICT)
     assert data1[0].longname == "Top of atmosphere net radiative energy flux"
@@ -189,9 +263,13 @@ def test_gridcell_variance(tolerance=0.001):
 def main():
     test_gridcell_area_conservation()
     test_harvester_get_files()
+    test_drop_variables()
+    test_multiple_variables()
+    test_single_file()
     test_variable_names()
     test_units()
     test_cycletime()
+    test_irregular_cycletime()
     test_longname()
     test_global_mean_values()
     #test_global_mean_values2()
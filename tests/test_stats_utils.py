@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+from netCDF4 import Dataset
+
+from score_hv import stats_utils
+
+DATA_DIR = os.path.join(Path(__file__).parent.parent.resolve(), 'src', 'score_hv', 'data')
+GRIDCELL_AREA_DATA_PATH = os.path.join(DATA_DIR,
+                                       'gridcell-area' + 
+                                       '_noaa-ufs-gefsv13replay-pds' + 
+                                       '_bfg_control_1536x768_20231116.nc')
+
+def get_gridcell_area():
+    with Dataset(GRIDCELL_AREA_DATA_PATH) as gridcell_area_data:
+        return np.asarray(gridcell_area_data.variables['area'][:],
+                          dtype=np.float64)
+
+def get_test_field(mean=300., std=0.3, seed=0):
+    """returns a float32 field on the gridcell area grid with a large mean
+    relative to its spread, the case most sensitive to rounding error
+    """
+    rng = np.random.default_rng(seed)
+    shape = get_gridcell_area().shape
+    return (mean + std * rng.standard_normal(shape)).astype(np.float32)
+
+def test_float64_reference(tolerance=1e-12):
+    """Float32 data and float32 weights must still give the mean and variance
+    of a float64 np.average reference
+    """
+    gridcell_area = get_gridcell_area()
+    field = get_test_field()
+    
+    statistics = stats_utils.area_weighted_statistics(
+                                        field, gridcell_area.astype(np.float32))
+    
+    field_64 = field.astype(np.float64)
+    weights_64 = gridcell_area.astype(np.float32).astype(np.float64)
+    mean = np.average(field_64, weights=weights_64)
+    variance = np.average((field_64 - mean)**2, weights=weights_64)
+    
+    assert abs(statistics['mean'] - mean) <= tolerance * abs(mean)
+    assert abs(statistics['variance'] - variance) <= 1e-9 * variance
+
+def get_reference_statistics(field, gridcell_area, valid):
+    """returns the float64 reference statistics of the valid cells of field
+    """
+    values = field[valid].astype(np.float64)
+    weights = gridcell_area[valid]
+    mean = np.average(values, weights=weights)
+    return {'mean': mean,
+            'variance': np.average((values - mean)**2, weights=weights),
+            'minimum': values.min(),
+            'maximum': values.max()}
+
+def test_shape_mismatch():
+    """Variable data and gridcell area weights on different grids raise a
+    ValueError
+    """
+    gridcell_area = get_gridcell_area()
+    with pytest.raises(ValueError):
+        stats_utils.area_weighted_statistics(get_test_field()[:, :-1],
+                                             gridcell_area)
+
+def test_nan_cells_excluded(tolerance=1e-12):
+    """NaN cells are left out of all four statistics
+    """
+    gridcell_area = get_gridcell_area()
+    field = get_test_field()
+    field[0, :10] = np.nan
+    valid = np.isfinite(field)
+    
+    statistics = stats_utils.area_weighted_statistics(field, gridcell_area)
+    expected = get_reference_statistics(field, gridcell_area, valid)
+    
+    assert sorted(statistics) == sorted(stats_utils.STATISTICS)
+    for statistic, value in statistics.items():
+        assert np.isfinite(value)
+        assert abs(value - expected[statistic]) <= (
+                                        tolerance * abs(expected[statistic]))
+
+def test_masked_cells_excluded(tolerance=1e-12):
+    """Masked cells are left out of all four statistics, even if their
+    underlying values are valid numbers
+    """
+    gridcell_area = get_gridcell_area()
+    field = get_test_field()
+    field[0, :5] = 1.e6
+    field[-1, :5] = -1.e6
+    masked_field = np.ma.masked_where(np.abs(field) == 1.e6, field)
+    valid = ~np.ma.getmaskarray(masked_field)
+    
+    statistics = stats_utils.area_weighted_statistics(masked_field,
+                                                      gridcell_area)
+    expected = get_reference_statistics(field, gridcell_area, valid)
+    
+    for statistic, value in statistics.items():
+        assert abs(value - expected[statistic]) <= (
+                                        tolerance * abs(expected[statistic]))
+
+def test_statistics_subset():
+    """Only the requested statistics are returned
+    """
+    statistics = stats_utils.area_weighted_statistics(
+                                            get_test_field(),
+                                            get_gridcell_area(),
+                                            statistics=('minimum',))
+    assert list(statistics) == ['minimum']
+
+def test_area_weighted_variance(tolerance=1e-9):
+    """area_weighted_variance must not lose the variance of a field whose
+    mean is large relative to its spread (mean of 300, variance of about
+    0.083), with or without a given expected value
+    """
+    gridcell_area = get_gridcell_area()
+    field = get_test_field(std=0.288)
+    expected = get_reference_statistics(field, gridcell_area,
+                                        np.isfinite(field))
+    
+    variance = stats_utils.area_weighted_variance(
+                                            field,
+                                            gridcell_area.astype(np.float32))
+    assert abs(variance - expected['variance']) <= (
+                                        tolerance * expected['variance'])
+    
+    variance = stats_utils.area_weighted_variance(
+                                            field, gridcell_area,
+                                            expected_value=expected['mean'])
+    assert abs(variance - expected['variance']) <= (
+                                        tolerance * expected['variance'])
+
+def main():
+    test_float64_reference()
+    test_shape_mismatch()
+    test_nan_cells_excluded()
+    test_masked_cells_excluded()
+    test_statistics_subset()
+    test_area_weighted_variance()
+
+if __name__=='__main__':
+    main()